@@ -12,6 +12,7 @@ ini_defaults = {
     "Paths": {
         "MEDIA_PLAYER_PATH": "/usr/bin/ffmpeg",
         "RTMP_STREAMER_PATH": "/usr/local/bin/ffmpeg",
+        "FFPROBE_PATH": "/usr/bin/ffprobe",
         "BASE_PATH": "/media/videos/",
         "MEDIA_PLAYLIST": "playlist.txt",
         "PLAY_INDEX_FILE": "%(BASE_PATH)s/play_index.txt",
@@ -56,6 +57,7 @@ ini_defaults = {
     "Retry": {
         "RETRY_ATTEMPTS": 0,
         "RETRY_PERIOD": 5,
+        "RETRY_PERIOD_MAX": 0,
         "EXIT_ON_FILE_NOT_FOUND": False,
     },
     "SSH": {
@@ -146,32 +148,34 @@ else:
     VERBOSE = 0b11111100
 
 
+# print2 levels, mapped to the VERBOSE bitmask that enables them, the
+# label printed before the message, and whether the message is also
+# written to ERROR_LOG.
+_PRINT2_LEVELS = {
+    "fatal": (0b10000000, "\033[31m[Fatal]\033[0m", True),
+    "error": (0b1000000, "\033[31m[Error]\033[0m", True),
+    "warn": (0b100000, "\033[93m[Warn]\033[0m", True),
+    "notice": (0b10000, "\033[96m[Notice]\033[0m", False),
+    "play": (0b1000, "\033[92m[Play]\033[0m", False),
+    "info": (0b100, "[Info]", False),
+    "verbose": (0b10, "\033[90m[Verbose]\033[0m", False),
+    "verbose2": (0b1, "\033[90m[Debug]\033[0m", False),
+    "debug": (0b1, "\033[90m[Debug]\033[0m", False),
+}
+
+
 def print2(level: str, message: str, *, force=False):
     """Prepend a colored label to a standard print message.
     Also writes messages with severity `warn` or higher to
     log file.
     """
-    current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    reset = "\033[0m"
-
-    levels = {
-        "fatal": (0b10000000, f"\033[31m[Fatal]{reset}", True),
-        "error": (0b1000000, f"\033[31m[Error]{reset}", True),
-        "warn": (0b100000, f"\033[93m[Warn]{reset}", True),
-        "notice": (0b10000, f"\033[96m[Notice]{reset}", False),
-        "play": (0b1000, f"\033[92m[Play]{reset}", False),
-        "info": (0b100, "[Info]", False),
-        "verbose": (0b10, f"\033[90m[Verbose]{reset}", False),
-        "verbose2": (0b1, f"\033[90m[Debug]{reset}", False),
-        "debug": (0b1, f"\033[90m[Debug]{reset}", False),
-    }
-
-    if level not in levels:
-        raise ValueError(f"Invalid print2 level: {level}")
-
-    bitmask, label, log_to_file = levels[level]
+    try:
+        bitmask, label, log_to_file = _PRINT2_LEVELS[level]
+    except KeyError:
+        raise ValueError(f"Invalid print2 level: {level}") from None
 
     if force or (VERBOSE & bitmask):
+        current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"{current_time} {label} {message}")
 
         if log_to_file and ERROR_LOG is not None:
@@ -181,6 +185,7 @@ def print2(level: str, message: str, *, force=False):
 
 MEDIA_PLAYER_PATH = default_ini.get("Paths", "MEDIA_PLAYER_PATH")
 RTMP_STREAMER_PATH = default_ini.get("Paths", "RTMP_STREAMER_PATH")
+FFPROBE_PATH = default_ini.get("Paths", "FFPROBE_PATH")
 BASE_PATH = os.path.expanduser(default_ini.get("Paths", "BASE_PATH"))
 PLAY_INDEX_FILE = os.path.expanduser(default_ini.get("Paths", "PLAY_INDEX_FILE"))
 PLAY_HISTORY_FILE = (
@@ -343,6 +348,11 @@ RETRY_PERIOD = (
     if default_ini.getint("Retry", "RETRY_PERIOD") != 0
     else 5
 )
+RETRY_PERIOD_MAX = (
+    max(default_ini.getint("Retry", "RETRY_PERIOD_MAX"), RETRY_PERIOD)
+    if default_ini.getint("Retry", "RETRY_PERIOD_MAX") != 0
+    else max(60, RETRY_PERIOD * 32)
+)
 EXIT_ON_FILE_NOT_FOUND = default_ini.getboolean("Retry", "EXIT_ON_FILE_NOT_FOUND")
 
 REMOTE_ADDRESS = (
@@ -749,6 +759,9 @@ if MAIL_ENABLE:
     else:
         MAIL_ALERT_STATUS_REPORT_TIME = (0, 0)
 
+# Interval between status reports in seconds.
+MAIL_ALERT_STATUS_REPORT_SECONDS = MAIL_ALERT_STATUS_REPORT * 86400
+
 
 # Deprecated options.
 if default_ini.has_option("SSH", "REMOTE_RETRY_PERIOD"):
@@ -26,7 +26,7 @@ import config
 import mail
 import playlist
 from config import print2
-from streamstats import StreamStats
+from streamstats import StreamStats, get_stats
 from utils import check_file, int_to_time, int_to_total_time
 
 
@@ -445,7 +445,7 @@ def encoder_task(
             stats.mail_daemon.add_alert("status_report", status_report)
             stats.next_status_report = datetime.datetime.now(
                 datetime.timezone.utc
-            ) + datetime.timedelta(days=config.MAIL_ALERT_STATUS_REPORT)
+            ) + datetime.timedelta(seconds=config.MAIL_ALERT_STATUS_REPORT_SECONDS)
 
         time.sleep(1)
 
@@ -525,7 +525,7 @@ def main():
     instant_restarted: bool = False
     media_playlist = playlist.create_playlist()
     media_playlist_length = len(media_playlist)
-    stats = StreamStats()
+    stats = get_stats()
     total_elapsed_time = 0
 
     # Start RTMP broadcast task, to be stopped when total_elapsed_time
@@ -976,7 +976,7 @@ def main():
                             if config.SCHEDULE_PATH is not None:
                                 if (
                                         config.SCHEDULE_EXCLUDE_FILE_PATTERN is None
-                                        or not video_file.name.casefold().startswith(
+                                        or not video_file.casefold_name().startswith(
                                         config.SCHEDULE_EXCLUDE_FILE_PATTERN
                                     )
                                 ):
@@ -1187,7 +1187,7 @@ def main():
                 datetime.datetime.now(datetime.timezone.utc) - stats.last_exception_time
             )
             stats.exceptions.append((e, datetime.datetime.now()))
-            stats.last_exception_time = datetime.datetime.now(datetime.timezone.utc)
+            stats.set_last_exception_time()
 
             # Do not send an e-mail on connection check failure.
             if stats.mail_daemon_running(config.MAIL_ALERT_ON_STREAM_DOWN):
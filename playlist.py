@@ -1,12 +1,18 @@
 """Functions for handling the playlist and schedule files."""
 
+import atexit
 import datetime
+import functools
 import itertools
 import json
 import os
+import subprocess
 import sys
 import threading
+import time
 from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import suppress
 from dataclasses import dataclass, field
 from typing import Generator, Optional, Tuple
 
@@ -17,13 +23,12 @@ from paramiko.ssh_exception import (
     PasswordRequiredException,
     SSHException,
 )
-from pebble import concurrent
-from pymediainfo import MediaInfo
+from pebble import ThreadPool, concurrent
 
 import config
 from config import print2
 from streamstats import StreamStats
-from utils import check_file, int_to_time
+from utils import check_file, clear_isfile_cache, int_to_time
 
 
 class PlaylistException(Exception):
@@ -36,7 +41,16 @@ class PlaylistException(Exception):
         self.original_exception = original_exception
 
 
-@dataclass
+@functools.lru_cache(maxsize=None)
+def _resolve_path(file_name: str, base_path: str) -> str:
+    """Return `file_name` joined to `base_path` if it is a relative path.
+    Entries repeated in the playlist share the same path string.
+    """
+
+    return file_name if os.path.isabs(file_name) else os.path.join(base_path, file_name)
+
+
+@dataclass(slots=True)
 class PlaylistEntry:
     """Definition for playlist entries, parsed from a list or text file
     containing formatted playlist entry strings.
@@ -85,31 +99,50 @@ class PlaylistEntry:
     For command entries, the directive to run.
     """
 
+    _casefold_source: Optional[str] = field(
+        init=False, default=None, repr=False, compare=False
+    )
+    _casefold_name: Optional[str] = field(
+        init=False, default=None, repr=False, compare=False
+    )
+
     def __post_init__(self):
         if self.entry is None:
             self.type = "blank"
-        elif self.entry.startswith(":"):
-            self.type = "extra"
-            self.info = self.entry[1:]
-        elif self.entry.startswith("%"):
-            self.type = "command"
-            self.info = self.entry[1:]
-        else:
-            self.type = "normal"
-            split_name = self.entry.split(" :", 1)
-            self.name = os.path.splitext(split_name[0])[0]
-            self.path = (
-                os.path.join(config.BASE_PATH, "".join(split_name[0]))
-                if not os.path.isabs(split_name[0])
-                else split_name[0]
-            )
-            if len(split_name) > 1:
-                self.info = split_name[1]
-            else:
-                self.info = ""
+            return
+
+        # The entry type is determined by the first character only.
+        # Names and info strings are interned, as playlists often repeat
+        # them, and paths are shared through _resolve_path().
+        match self.entry[:1]:
+            case ":":
+                self.type = "extra"
+                self.info = sys.intern(self.entry[1:])
+            case "%":
+                self.type = "command"
+                self.info = self.entry[1:]
+            case _:
+                self.type = "normal"
+                split_name = self.entry.split(" :", 1)
+                self.name = sys.intern(os.path.splitext(split_name[0])[0])
+                self.path = _resolve_path(split_name[0], config.BASE_PATH)
+                if len(split_name) > 1:
+                    self.info = sys.intern(split_name[1])
+                else:
+                    self.info = ""
+
+    def casefold_name(self) -> str:
+        """Return `self.name` casefolded. The result is kept until `name`
+        is replaced, such as by an alternate name.
+        """
 
+        if self._casefold_source is not self.name:
+            self._casefold_source = self.name
+            self._casefold_name = self.name.casefold()
+        return self._casefold_name
 
-@dataclass
+
+@dataclass(slots=True)
 class PlaylistTestEntry(PlaylistEntry):
     """A `PlaylistEntry` intended for use in unit tests. It has an extra
     attribute, `length`, that will always be returned by `get_length()`.
@@ -118,13 +151,43 @@ class PlaylistTestEntry(PlaylistEntry):
     length: int = 60
 
     def __post_init__(self):
-        super().__post_init__()
+        # Zero-argument super() does not work in slotted dataclasses.
+        PlaylistEntry.__post_init__(self)
         if self.type == "normal":
             self.path = None
 
 
+# Arguments passed to config.FFPROBE_PATH by get_length(), followed by the
+# video path. The output is the codec type of the first video stream, if any,
+# followed by the duration of the container in seconds.
+_FFPROBE_ARGUMENTS = (
+    "-v",
+    "error",
+    "-select_streams",
+    "v:0",
+    "-show_entries",
+    "stream=codec_type:format=duration",
+    "-of",
+    "default=noprint_wrappers=1:nokey=1",
+)
+
+# Lengths of video files retrieved by get_length(), keyed by path. Values are
+# tuples of the file's modification time in nanoseconds, its size, and its
+# length, so that a changed file is parsed again.
+_length_cache: dict[str, Tuple[int, int, int]] = {}
+
+
+class FFprobeNotFoundError(Exception):
+    """Raised by `get_length()` if `config.FFPROBE_PATH` cannot be run."""
+
+
 def get_length(video) -> int:
-    """Retrieve length of a video file using pymediainfo."""
+    """Retrieve length of a video file using ffprobe. Raises `IndexError` if
+    the file contains no video tracks, `ValueError` if its duration is
+    unknown, and `FFprobeNotFoundError` if ffprobe cannot be run.
+
+    Lengths are cached until the file's modification time or size changes.
+    """
 
     if isinstance(video, PlaylistTestEntry):
         return video.length
@@ -136,12 +199,97 @@ def get_length(video) -> int:
         return 0
 
     if isinstance(video, str):
-        mediainfo = MediaInfo.parse(video)
-        return int(float(mediainfo.video_tracks[0].duration) // 1000)
+        video_stat = os.stat(video)
+        cached = _length_cache.get(video)
+        if (
+            cached is not None
+            and cached[0] == video_stat.st_mtime_ns
+            and cached[1] == video_stat.st_size
+        ):
+            return cached[2]
+
+        # A missing ffprobe must not be reported as a missing video file.
+        try:
+            ffprobe_output = subprocess.run(
+                (config.FFPROBE_PATH, *_FFPROBE_ARGUMENTS, video),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                check=True,
+            ).stdout.split()
+        except OSError as e:
+            raise FFprobeNotFoundError(
+                f"Unable to run ffprobe at {config.FFPROBE_PATH}: {e}"
+            ) from e
+        if ffprobe_output[:1] != [b"video"]:
+            raise IndexError(f"{video} contains no video tracks.")
+        try:
+            length = int(float(ffprobe_output[1]))
+        except (IndexError, ValueError):
+            raise ValueError(f"{video} has no known duration.") from None
+        _length_cache[video] = (video_stat.st_mtime_ns, video_stat.st_size, length)
+        return length
 
     raise ValueError("Expected PlaylistEntry, path, or None.")
 
 
+# Maximum number of videos probed at once by prefetch_lengths(). The
+# pool is shared by all calls, so its threads are reused.
+PREFETCH_WORKERS = 2
+_prefetch_pool = ThreadPool(max_workers=PREFETCH_WORKERS)
+
+
+def _prefetch_length(path):
+    """Call `get_length()` on `path`, ignoring any errors."""
+
+    with suppress(Exception):
+        get_length(path)
+
+
+def prefetch_lengths(playlist: list, entry_index: int, count: int):
+    """Retrieve the lengths of up to `count` normal entries concurrently,
+    starting from `entry_index` and looping the playlist around, so that
+    later calls to `get_length()` for them return cached values.
+
+    Errors are ignored here, and will be raised again when the length of
+    the entry is retrieved normally.
+    """
+
+    paths = []
+    playlist_length = len(playlist)
+    for i in range(entry_index, entry_index + playlist_length):
+        entry = playlist[i % playlist_length][1]
+        if entry.type != "normal" or entry.path is None:
+            continue
+        if entry.path not in _length_cache and entry.path not in paths:
+            paths.append(entry.path)
+        count -= 1
+        if count <= 0:
+            break
+
+    if not paths:
+        return
+
+    futures = [
+        _prefetch_pool.schedule(_prefetch_length, args=(path,)) for path in paths
+    ]
+    for future in futures:
+        future.result()
+
+
+# Lines starting with these comment prefixes, and blank lines, are
+# stored as blank entries in the playlist.
+_COMMENT_PREFIXES = (";", "#", "//")
+
+# Messages printed by `create_playlist()` for each entry type. Formatted
+# with the line number and the `PlaylistEntry`.
+_ENTRY_VERBOSE_MESSAGES = {
+    "normal": "Adding normal entry: {0}. {1.name}",
+    "extra": "Adding extra entry: {0}. {1.info}",
+    "command": "Adding command: {0}. {1.info}",
+    "blank": "Blank line or comment: {0}.",
+}
+
+
 def create_playlist() -> list[Tuple[int, PlaylistEntry]]:
     """Read `config.MEDIA_PLAYLIST`, which is set to either the path to a text
     file or a list, containing a sequence of playlist entries.
@@ -170,11 +318,12 @@ def create_playlist() -> list[Tuple[int, PlaylistEntry]]:
         print2("error", "MEDIA_PLAYLIST is not a file or Python list.")
         sys.exit(1)
 
-    # Change blank lines and comment entries in media_playlist to None.
-    media_playlist = [
-        i if i != "" and not i.startswith((";", "#", "//")) else None
-        for i in media_playlist
-    ]
+    # Config values read once per entry are bound to locals before the loop.
+    # Names whose alternate name is not a string are reported the first
+    # time an entry uses them, and then removed from invalid_alt_names.
+    alt_names = {k: v for k, v in config.ALT_NAMES.items() if isinstance(v, str)}
+    invalid_alt_names = config.ALT_NAMES.keys() - alt_names.keys()
+    verbose = config.VERBOSE & 0b1111111
 
     # Create an enumerated list of playlist entries, starting at 1,
     # corresponding to line numbers in the playlist text file.
@@ -183,34 +332,29 @@ def create_playlist() -> list[Tuple[int, PlaylistEntry]]:
     entry_count = 0
     for i in media_playlist:
         entry_count += 1
+        # Blank lines and comment entries are changed to None.
+        if i == "" or i.startswith(_COMMENT_PREFIXES):
+            i = None
         new_entry = PlaylistEntry(i)
 
         # Read the ALT_NAMES dictionary. If filename has a matching
         # key, replace the name with the value.
-        if new_entry.type == "normal" and new_entry.name in config.ALT_NAMES:
-            if isinstance(config.ALT_NAMES[new_entry.name], str):
-                new_entry.name = config.ALT_NAMES[new_entry.name]
-            else:
+        if new_entry.type == "normal":
+            alt_name = alt_names.get(new_entry.name)
+            if alt_name is not None:
+                new_entry.name = alt_name
+            elif new_entry.name in invalid_alt_names:
+                invalid_alt_names.remove(new_entry.name)
                 print2(
                     "warn",
                     f"Alternate name for {new_entry.name} in alt_names.json is not a valid string.",
                 )
 
-        if config.VERBOSE & 0b1111111:
-            if new_entry.type == "normal":
-                if new_entry.info == "":
-                    print2("verbose", f"Adding normal entry: {index}. {new_entry.name}")
-                else:
-                    print2(
-                        "verbose",
-                        f"Adding normal entry: {index}. {new_entry.name} - Extra info: {new_entry.info}",
-                    )
-            elif new_entry.type == "extra":
-                print2("verbose", f"Adding extra entry: {index}. {new_entry.info}")
-            elif new_entry.type == "command":
-                print2("verbose", f"Adding command: {index}. {new_entry.info}")
-            elif new_entry.type == "blank":
-                print2("verbose", f"Blank line or comment: {index}.")
+        if verbose:
+            message = _ENTRY_VERBOSE_MESSAGES[new_entry.type].format(index, new_entry)
+            if new_entry.type == "normal" and new_entry.info != "":
+                message += f" - Extra info: {new_entry.info}"
+            print2("verbose", message)
         playlist.append((index, new_entry))
 
         index += 1
@@ -225,31 +369,83 @@ def create_playlist() -> list[Tuple[int, PlaylistEntry]]:
     return playlist
 
 
+# Seconds that the result of get_stream_restart_duration() is reused.
+STREAM_RESTART_DURATION_CACHE_TIME = 60
+
+
 def get_stream_restart_duration():
     """Helper function to add combined duration of
     config.STREAM_RESTART_BEFORE_VIDEO,
     config.STREAM_RESTART_AFTER_VIDEO,
     and config.STREAM_RESTART_WAIT.
+
+    The result is reused for up to `STREAM_RESTART_DURATION_CACHE_TIME`
+    seconds, or until any of the above settings change.
+    """
+
+    return _get_stream_restart_duration(
+        config.STREAM_RESTART_BEFORE_VIDEO,
+        config.STREAM_RESTART_AFTER_VIDEO,
+        config.STREAM_RESTART_WAIT,
+        config.VIDEO_PADDING,
+        int(time.monotonic() // STREAM_RESTART_DURATION_CACHE_TIME),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _get_stream_restart_duration(
+    before_video, after_video, restart_wait, video_padding, time_bucket
+):
+    """Cached helper for `get_stream_restart_duration()`. The result is
+    reused while all arguments are unchanged. `time_bucket` is not used
+    in the calculation; it is only part of the cache key, so the result
+    expires once per `STREAM_RESTART_DURATION_CACHE_TIME` seconds.
     """
 
     duration = 0
 
-    if config.STREAM_RESTART_BEFORE_VIDEO is not None and check_file(
-        config.STREAM_RESTART_BEFORE_VIDEO, line_num=-1, no_exit=True
-    ):
-        duration += (
-            get_length(config.STREAM_RESTART_BEFORE_VIDEO) + config.VIDEO_PADDING
-        )
-    if config.STREAM_RESTART_AFTER_VIDEO is not None and check_file(
-        config.STREAM_RESTART_AFTER_VIDEO, line_num=-2, no_exit=True
-    ):
-        duration += get_length(config.STREAM_RESTART_AFTER_VIDEO) + config.VIDEO_PADDING
-    duration += config.STREAM_RESTART_WAIT
+    if before_video is not None and check_file(before_video, line_num=-1, no_exit=True):
+        duration += get_length(before_video) + video_padding
+    if after_video is not None and check_file(after_video, line_num=-2, no_exit=True):
+        duration += get_length(after_video) + video_padding
+    duration += restart_wait
 
     return duration
 
 
-@concurrent.thread
+def format_schedule_time(timestamp: float) -> str:
+    """Format a Unix timestamp as a UTC time string for the `time` key of
+    schedule entries.
+    """
+
+    return "%04d-%02d-%02d %02d:%02d:%02d" % time.gmtime(timestamp)[:6]
+
+
+# Single-worker pools that run schedule writes, index writes and schedule
+# uploads one at a time, reusing the same thread instead of starting a
+# new one for every call.
+_schedule_pool = ThreadPool(max_workers=1)
+_index_pool = ThreadPool(max_workers=1)
+_upload_pool = ThreadPool(max_workers=1)
+
+
+def _run_in_pool(pool: ThreadPool):
+    """Decorator that schedules the function in `pool` and returns a
+    Future, like `concurrent.thread` but with a persistent worker.
+    Calls that have not started yet can be cancelled.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            return pool.schedule(function, args=args, kwargs=kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@_run_in_pool(_schedule_pool)
 def write_schedule(
     playlist: list,
     entry_index: int,
@@ -305,20 +501,22 @@ def write_schedule(
         runs out.
         """
 
-        list_iter = (i for i in list_sub[index_sub:])
-        list_full_iter = itertools.cycle(list(list_sub))
+        list_length = len(list_sub)
+        for i in itertools.count(index_sub):
+            yield list_sub[i % list_length]
 
-        while True:
-            try:
-                yield next(list_iter)
-            except StopIteration:
-                yield next(list_full_iter)
+    # Files are checked again on every schedule write.
+    clear_isfile_cache()
 
     # For the first file in playlist, this is the current system time.
     # Time is retrieved in UTC, to be converted to user's local time
     # when they load the schedule in their browser.
     start_time = datetime.datetime.now(datetime.timezone.utc)
-    current_schedule_time = datetime.datetime.now(datetime.timezone.utc)
+
+    # The start time of each entry is tracked as a Unix timestamp and only
+    # formatted when an entry is written to the schedule.
+    start_timestamp = start_time.timestamp()
+    current_schedule_timestamp = start_timestamp
 
     # total_duration is the cumulative duration of all videos added so
     # far and is checked against config.SCHEDULE_UPCOMING_LENGTH.
@@ -328,12 +526,12 @@ def write_schedule(
     # to determine automatic restarts from config.STREAM_TIME_BEFORE_RESTART.
     stream_duration = stats.stream_time_remaining
 
-    # coming_up_next is a deque of PlaylistEntry objects starting with the
-    # current video up to the amount of videos defined by the limits
-    # config.SCHEDULE_MAX_VIDEOS and config.SCHEDULE_UPCOMING_LENGTH.
+    # normal_count is the number of normal entries read after the current
+    # video, and is checked against config.SCHEDULE_MIN_VIDEOS and
+    # config.SCHEDULE_MAX_VIDEOS.
     # coming_up_next_json is a list containing info extracted from the
     # PlaylistEntry objects.
-    coming_up_next = deque()
+    normal_count = 0
     coming_up_next_json = []
 
     # If the first video in the schedule is starting after 0,
@@ -360,6 +558,11 @@ def write_schedule(
                     }
                 )
 
+    # Probe the videos likely to be in the schedule concurrently. Entries
+    # that are excluded from the schedule are not counted, so later entries
+    # may still be probed one at a time in the loop below.
+    prefetch_lengths(playlist, entry_index, config.SCHEDULE_MAX_VIDEOS + 1)
+
     # First entry is the video playing now and is added unconditionally.
     _, entry = playlist[entry_index]
     entry_length = get_length(entry)
@@ -367,8 +570,8 @@ def write_schedule(
         {
             "type": "normal",
             "name": entry.name,
-            "time": start_time.strftime("%Y-%m-%d %H:%M:%S"),
-            "unixtime": start_time.timestamp(),
+            "time": format_schedule_time(current_schedule_timestamp),
+            "unixtime": current_schedule_timestamp,
             "length": entry_length,
             "extra_info": entry.info,
         }
@@ -385,9 +588,7 @@ def write_schedule(
     stream_duration += entry_length
 
     # Advance timestamp for next entry by combined length and offset of previous file.
-    current_schedule_time = current_schedule_time + datetime.timedelta(
-        seconds=entry_length
-    )
+    current_schedule_timestamp += entry_length
 
     sub_playlist = iter_playlist(playlist, entry_index)
     entry = next(sub_playlist)
@@ -404,13 +605,8 @@ def write_schedule(
         # Break when the number of minimum entries is reached and either entry or
         # duration limit is reached. Entries that were skipped for matching
         # SCHEDULE_EXCLUDE_FILE_PATTERN are not counted.
-        if (
-            len([i for i in coming_up_next if i.type == "normal"])
-            >= config.SCHEDULE_MIN_VIDEOS
-        ):
-            if len([i for i in coming_up_next if i.type == "normal"]) >= (
-                config.SCHEDULE_MAX_VIDEOS + skipped_normal_entries
-            ):
+        if normal_count >= config.SCHEDULE_MIN_VIDEOS:
+            if normal_count >= config.SCHEDULE_MAX_VIDEOS + skipped_normal_entries:
                 print2(
                     "verbose",
                     "SCHEDULE_MAX_VIDEOS reached.",
@@ -433,7 +629,13 @@ def write_schedule(
             if check_file(entry.path, playlist_line_num, no_exit=True, stats=stats):
                 try:
                     entry_length = get_length(entry)
-                    coming_up_next.append(entry)
+                    normal_count += 1
+                except FFprobeNotFoundError as e:
+                    print2(
+                        "error",
+                        f"{e}. Check FFPROBE_PATH. Schedule file not written.",
+                    )
+                    return
                 except FileNotFoundError as e:
                     print2(
                         "error",
@@ -500,7 +702,7 @@ def write_schedule(
             # Name begins with any strings in SCHEDULE_EXCLUDE_FILE_PATTERN
             if (
                 config.SCHEDULE_EXCLUDE_FILE_PATTERN is not None
-                and entry.name.casefold().startswith(
+                and entry.casefold_name().startswith(
                     config.SCHEDULE_EXCLUDE_FILE_PATTERN
                 )
             ):
@@ -523,9 +725,7 @@ def write_schedule(
                 stream_duration += entry_length
 
                 # Advance timestamp for next entry by length of excluded file.
-                current_schedule_time = current_schedule_time + datetime.timedelta(
-                    seconds=length_offset
-                )
+                current_schedule_timestamp += length_offset
                 skipped_normal_entries += 1
                 continue
 
@@ -540,16 +740,14 @@ def write_schedule(
                 stream_duration = 0
             else:
                 length_offset = 0
-            current_schedule_time = current_schedule_time + datetime.timedelta(
-                seconds=length_offset
-            )
+            current_schedule_timestamp += length_offset
 
             coming_up_next_json.append(
                 {
                     "type": "normal",
                     "name": entry.name,
-                    "time": current_schedule_time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "unixtime": current_schedule_time.timestamp(),
+                    "time": format_schedule_time(current_schedule_timestamp),
+                    "unixtime": current_schedule_timestamp,
                     "length": entry_length,
                     "extra_info": entry.info,
                 }
@@ -563,12 +761,9 @@ def write_schedule(
             total_duration += entry_length
             stream_duration += entry_length
 
-            current_schedule_time = current_schedule_time + datetime.timedelta(
-                seconds=entry_length
-            )
+            current_schedule_timestamp += entry_length
 
         elif entry.type == "extra":
-            coming_up_next.append(entry)
             coming_up_next_json.append(
                 {
                     "type": "extra",
@@ -585,7 +780,6 @@ def write_schedule(
             )
 
         elif entry.type == "command":
-            coming_up_next.append(entry)
             if entry.info == "RESTART":
                 length_offset = get_stream_restart_duration()
             elif entry.info == "INSTANT_RESTART":
@@ -639,12 +833,12 @@ def write_schedule(
         ):
             # Pop left from recent_playlist and append until a normal entry is added.
             while stats.recent_playlist[0]["type"] != "normal":
-                stats.previous_files.append(stats.recent_playlist.popleft())
+                stats.add_previous_file(stats.recent_playlist.popleft())
                 print2(
                     "verbose",
                     f"Added {stats.previous_files[-1]['type']} entry {stats.previous_files[-1]['name']} to the previous_files array.",
                 )
-            stats.previous_files.append(stats.recent_playlist.popleft())
+            stats.add_previous_file(stats.recent_playlist.popleft())
             print2(
                 "verbose",
                 f"Added {stats.previous_files[-1]['name']} to the previous_files array.",
@@ -653,16 +847,12 @@ def write_schedule(
             # If combined length of previous_files exceeds SCHEDULE_PREVIOUS_LENGTH,
             # or number of videos exceeds SCHEDULE_PREVIOUS_MAX_VIDEOS, prune
             # previous_files.
-            total_normal_previous_files = sum(
-                i["type"] == "normal" for i in stats.previous_files
-            )
-            while total_normal_previous_files > config.SCHEDULE_PREVIOUS_MAX_VIDEOS:
+            while stats.prev_normal_count > config.SCHEDULE_PREVIOUS_MAX_VIDEOS:
                 while stats.previous_files[0]["type"] != "normal":
-                    stats.previous_files.popleft()
-                stats.previous_files.popleft()
-                total_normal_previous_files -= 1
+                    stats.pop_previous_file()
+                stats.pop_previous_file()
 
-            if total_normal_previous_files > config.SCHEDULE_PREVIOUS_MIN_VIDEOS:
+            if stats.prev_normal_count > config.SCHEDULE_PREVIOUS_MIN_VIDEOS:
                 if config.SCHEDULE_PREVIOUS_PRUNE_TIGHT:
                     files_to_prune = 0
                 else:
@@ -671,19 +861,14 @@ def write_schedule(
                     if int(i["unixtime"]) == 0:
                         continue
 
-                    entry_timestamp = datetime.datetime.fromtimestamp(
-                        i["unixtime"], tz=datetime.timezone.utc
-                    )
-                    previous_time_difference = int(
-                        (start_time - entry_timestamp).total_seconds()
-                    )
+                    previous_time_difference = int(start_timestamp - i["unixtime"])
                     print2(
                         "verbose",
-                        f"Schedule generation start time: {int(start_time.timestamp())} ({start_time.strftime('%Y-%m-%d %H:%M:%S')}). {i['name']} start time: {int(entry_timestamp.timestamp())} ({entry_timestamp.strftime('%Y-%m-%d %H:%M:%S')}).",
+                        f"Schedule generation start time: {int(start_timestamp)} ({format_schedule_time(start_timestamp)}). {i['name']} start time: {int(i['unixtime'])} ({format_schedule_time(i['unixtime'])}).",
                     )
                     print2(
                         "verbose",
-                        f"Previous time difference: {str(datetime.timedelta(seconds=previous_time_difference))}.",
+                        f"Previous time difference: {int_to_time(previous_time_difference)}.",
                     )
                     if (
                         previous_time_difference > config.SCHEDULE_PREVIOUS_LENGTH
@@ -696,25 +881,28 @@ def write_schedule(
                         break
 
                 while (
-                    total_normal_previous_files > config.SCHEDULE_PREVIOUS_MIN_VIDEOS
+                    stats.prev_normal_count > config.SCHEDULE_PREVIOUS_MIN_VIDEOS
                     and files_to_prune > 0
                 ):
-                    pop = stats.previous_files.popleft()
+                    pop = stats.pop_previous_file()
                     print2("verbose", f"Removed {pop['name']} from previous_files.")
                     if pop["type"] == "normal":
                         files_to_prune -= 1
-                        total_normal_previous_files -= 1
 
     elif ignore_previous_files:
         print2("verbose", "Not updating previous_files.")
 
-    stats.recent_playlist = deque(coming_up_next_json.copy())
+    # coming_up_next_json is not used again after this call, so the deque
+    # can be built from it directly.
+    stats.recent_playlist = deque(coming_up_next_json)
 
     schedule_json_out = {
-        "program_start_time": stats.program_start_time.strftime("%Y-%m-%d %H:%M:%S"),
-        "video_start_time": start_time.strftime("%Y-%m-%d %H:%M:%S"),
+        "program_start_time": format_schedule_time(
+            stats.program_start_time.timestamp()
+        ),
+        "video_start_time": format_schedule_time(start_timestamp),
         "offset_time": config.SCHEDULE_OFFSET,
-        "coming_up_next": list(coming_up_next_json),
+        "coming_up_next": coming_up_next_json,
         "previous_files": list(stats.previous_files),
         "script_version": config.SCRIPT_VERSION,
     }
@@ -731,147 +919,266 @@ def write_schedule(
         return
 
     if config.REMOTE_ADDRESS is not None:
-        print2(
-            "verbose",
-            f"Uploading {config.SCHEDULE_PATH} to SSH server {config.REMOTE_ADDRESS}.",
-        )
-        upload_attempts_remaining = config.REMOTE_UPLOAD_ATTEMPTS
-        sleep_event = threading.Event()
-        upload_retry_delay = 1
-        upload_retry_max_delay = 64
+        queue_schedule_upload(stats)
 
-        upload_attempts_string = ""
 
-        # Log exceptions for e-mail alert. Items are tuples containing the
-        # exception and the timestamp.
-        ssh_exceptions: deque[tuple[Exception, datetime.datetime]] = deque(
-            maxlen=config.MAIL_ALERT_MAX_ERRORS_REPORTED
-        )
+# The pending or running schedule upload, if any. Guarded by
+# _upload_future_lock.
+_upload_future = None
+_upload_future_lock = threading.Lock()
 
-        # ssh_result is True if the upload succeeds, False if authentication
-        # fails, and None in all other cases where the upload does not succeed.
-        ssh_result = None
 
-        while upload_attempts_remaining != 0:
-            if upload_attempts_remaining > 0:
-                upload_attempts_remaining -= 1
-                if upload_attempts_remaining > 1:
-                    upload_attempts_string = (
-                        f"{upload_attempts_remaining} attempts remaining."
-                    )
-                else:
-                    upload_attempts_string = "1 attempt remaining."
+def queue_schedule_upload(stats: StreamStats):
+    """Queue an upload of `config.SCHEDULE_PATH` to the SSH server.
+    Uploads run in their own worker, so an unreachable server does not
+    delay later schedule writes. If an earlier upload has not started
+    yet, it is cancelled, since the new upload sends the same file with
+    newer contents.
+    """
 
-            err = None
-            try:
-                err = upload_ssh().result(timeout=10)
-                if err is None:
-                    print2("verbose", "SSH upload successful.")
-                    ssh_result = True
-                    break
-                raise err
-            except TimeoutError as e:
-                print2("error", "SSH upload timed out.")
-                ssh_exceptions.append((e, datetime.datetime.now()))
-            except (
-                AuthenticationException,
-                BadAuthenticationType,
-                PasswordRequiredException,
-            ) as e:
-                print2("error", f"SSH authentication failed: {e}")
-                print2("error", "SSH features disabled.")
-                ssh_exceptions.append((e, datetime.datetime.now()))
-                upload_attempts_remaining = 0
-                ssh_result = False
-                break
-            except SSHException as e:
-                print2("error", f"SSH error occurred: {e}")
-                ssh_exceptions.append((e, datetime.datetime.now()))
-            except OSError as e:
-                print2("error", f"SSH file operation error: {e}")
-                ssh_exceptions.append((e, datetime.datetime.now()))
-            except Exception as e:
-                print2("error", f"Remote upload failed: {type(e).__name__}: {e}")
-                ssh_exceptions.append((e, datetime.datetime.now()))
-            finally:
-                if err is not None:
-                    if upload_attempts_remaining != 0:
-                        print2(
-                            "error",
-                            f"{upload_attempts_string} Retrying in {upload_retry_delay} seconds...",
-                        )
-                        sleep_event.wait(timeout=upload_retry_delay)
-                        upload_retry_delay = min(
-                            upload_retry_delay * 2, upload_retry_max_delay
-                        )
-                        continue
+    global _upload_future
+
+    with _upload_future_lock:
+        if _upload_future is not None and _upload_future.cancel():
+            print2("verbose", "Replaced pending schedule upload with a newer one.")
+        _upload_future = upload_schedule(stats)
+
+
+@_run_in_pool(_upload_pool)
+def upload_schedule(stats: StreamStats):
+    """Upload `config.SCHEDULE_PATH` to the SSH server with `upload_ssh()`,
+    retrying up to `config.REMOTE_UPLOAD_ATTEMPTS` times, and send an
+    e-mail alert if any attempts failed.
+    """
+
+    if config.REMOTE_ADDRESS is None:
+        return
+
+    print2(
+        "verbose",
+        f"Uploading {config.SCHEDULE_PATH} to SSH server {config.REMOTE_ADDRESS}.",
+    )
+    upload_attempts_remaining = config.REMOTE_UPLOAD_ATTEMPTS
+    sleep_event = threading.Event()
+    upload_retry_delay = 1
+    upload_retry_max_delay = 64
+
+    upload_attempts_string = ""
+
+    # Log exceptions for e-mail alert. Items are tuples containing the
+    # exception and the timestamp.
+    ssh_exceptions: deque[tuple[Exception, datetime.datetime]] = deque(
+        maxlen=config.MAIL_ALERT_MAX_ERRORS_REPORTED
+    )
+
+    # ssh_result is True if the upload succeeds, False if authentication
+    # fails, and None in all other cases where the upload does not succeed.
+    ssh_result = None
+
+    while upload_attempts_remaining != 0:
+        if upload_attempts_remaining > 0:
+            upload_attempts_remaining -= 1
+            if upload_attempts_remaining > 1:
+                upload_attempts_string = (
+                    f"{upload_attempts_remaining} attempts remaining."
+                )
+            else:
+                upload_attempts_string = "1 attempt remaining."
 
+        err = None
+        try:
+            err = upload_ssh().result(timeout=10)
+            if err is None:
+                print2("verbose", "SSH upload successful.")
+                ssh_result = True
+                break
+            raise err
+        # concurrent.futures.TimeoutError is only an alias of TimeoutError
+        # from Python 3.11.
+        except (TimeoutError, FutureTimeoutError) as e:
+            print2("error", "SSH upload timed out.")
+            ssh_exceptions.append((e, datetime.datetime.now()))
+            # The connection may be half-open. Closing it unblocks the
+            # stalled upload, and the next attempt reconnects.
+            close_ssh_connection()
+        except (
+            AuthenticationException,
+            BadAuthenticationType,
+            PasswordRequiredException,
+        ) as e:
+            print2("error", f"SSH authentication failed: {e}")
+            print2("error", "SSH features disabled.")
+            ssh_exceptions.append((e, datetime.datetime.now()))
+            upload_attempts_remaining = 0
+            ssh_result = False
+            break
+        except SSHException as e:
+            print2("error", f"SSH error occurred: {e}")
+            ssh_exceptions.append((e, datetime.datetime.now()))
+        except OSError as e:
+            print2("error", f"SSH file operation error: {e}")
+            ssh_exceptions.append((e, datetime.datetime.now()))
+        except Exception as e:
+            print2("error", f"Remote upload failed: {type(e).__name__}: {e}")
+            ssh_exceptions.append((e, datetime.datetime.now()))
+        finally:
+            if err is not None:
+                if upload_attempts_remaining != 0:
                     print2(
                         "error",
-                        f"SSH upload failed after {config.REMOTE_UPLOAD_ATTEMPTS} attempts. Skipping SSH upload for this video.",
+                        f"{upload_attempts_string} Retrying in {upload_retry_delay} seconds...",
                     )
+                    sleep_event.wait(timeout=upload_retry_delay)
+                    upload_retry_delay = min(
+                        upload_retry_delay * 2, upload_retry_max_delay
+                    )
+                    continue
 
-        # Send e-mail alert for any exceptions logged.
-        if (
-            len(ssh_exceptions) > 0
-            and stats.mail_daemon is not None
-            and stats.mail_daemon.running
-            and config.MAIL_ALERT_ON_REMOTE_ERROR > 0
-        ):
-            message = ""
-            for exc, timestamp in ssh_exceptions:
-                message += f"{timestamp.strftime('%Y-%m-%d %H:%M:%S')} - {type(exc).__name__}: {exc}\n"
-            if config.MAIL_ALERT_MAX_ERRORS_REPORTED == 1:
-                message += "Only most recent error logged; earlier errors may have been truncated."
-                if config.ERROR_LOG is not None:
-                    message += f" Check {config.ERROR_LOG}."
-            elif len(ssh_exceptions) == config.MAIL_ALERT_MAX_ERRORS_REPORTED:
-                message += f"Last {config.MAIL_ALERT_MAX_ERRORS_REPORTED} errors logged; earlier errors may have been truncated."
-                if config.ERROR_LOG is not None:
-                    message += f" Check {config.ERROR_LOG}."
-            if ssh_result is None and config.MAIL_ALERT_ON_REMOTE_ERROR >= 1:
-                stats.mail_daemon.add_alert("remote_error", message)
-            elif not ssh_result and config.MAIL_ALERT_ON_REMOTE_ERROR >= 1:
-                stats.mail_daemon.add_alert("remote_auth_failed", message)
-                config.REMOTE_ADDRESS = None
-            elif ssh_result and config.MAIL_ALERT_ON_REMOTE_ERROR >= 2:
-                stats.mail_daemon.add_alert("remote_success_after_error", message)
+                print2(
+                    "error",
+                    f"SSH upload failed after {config.REMOTE_UPLOAD_ATTEMPTS} attempts. Skipping SSH upload for this video.",
+                )
+
+    # Send e-mail alert for any exceptions logged.
+    if (
+        len(ssh_exceptions) > 0
+        and stats.mail_daemon is not None
+        and stats.mail_daemon.running
+        and config.MAIL_ALERT_ON_REMOTE_ERROR > 0
+    ):
+        message = ""
+        for exc, timestamp in ssh_exceptions:
+            message += f"{timestamp.strftime('%Y-%m-%d %H:%M:%S')} - {type(exc).__name__}: {exc}\n"
+        if config.MAIL_ALERT_MAX_ERRORS_REPORTED == 1:
+            message += (
+                "Only most recent error logged; earlier errors may have been truncated."
+            )
+            if config.ERROR_LOG is not None:
+                message += f" Check {config.ERROR_LOG}."
+        elif len(ssh_exceptions) == config.MAIL_ALERT_MAX_ERRORS_REPORTED:
+            message += f"Last {config.MAIL_ALERT_MAX_ERRORS_REPORTED} errors logged; earlier errors may have been truncated."
+            if config.ERROR_LOG is not None:
+                message += f" Check {config.ERROR_LOG}."
+        if ssh_result is None and config.MAIL_ALERT_ON_REMOTE_ERROR >= 1:
+            stats.mail_daemon.add_alert("remote_error", message)
+        elif not ssh_result and config.MAIL_ALERT_ON_REMOTE_ERROR >= 1:
+            stats.mail_daemon.add_alert("remote_auth_failed", message)
+            config.REMOTE_ADDRESS = None
+        elif ssh_result and config.MAIL_ALERT_ON_REMOTE_ERROR >= 2:
+            stats.mail_daemon.add_alert("remote_success_after_error", message)
+
+
+# SSH connection reused by `upload_ssh()` across uploads, so the
+# handshake and authentication are only done once. _ssh_lock ensures
+# only one upload uses the connection at a time.
+_ssh_connection: Optional[fabric.Connection] = None
+_ssh_lock = threading.Lock()
+
+# Seconds an SSH transfer, or a wait for the connection, may stall
+# before failing.
+SSH_TIMEOUT = 10
+
+# Seconds between keepalive packets on the reused SSH connection.
+SSH_KEEPALIVE_INTERVAL = 30
+
+
+def close_ssh_connection():
+    """Close the SSH connection used by `upload_ssh()`, if one is open.
+    The next upload will open a new connection. This does not wait for
+    an upload in progress, which will fail and be retried.
+    """
+
+    global _ssh_connection
+
+    client, _ssh_connection = _ssh_connection, None
+    if client is not None:
+        with suppress(Exception):
+            client.close()
+
+
+atexit.register(close_ssh_connection)
 
 
 @concurrent.thread
 def upload_ssh():
     """Upload JSON file to a publicly accessible location using
-    fabric.
+    fabric. The connection is kept open for later uploads. It is
+    replaced if it has been disconnected, and discarded if an upload
+    fails.
     """
 
+    global _ssh_connection
+
     if config.REMOTE_KEY_FILE and not os.path.exists(config.REMOTE_KEY_FILE):
         raise AuthenticationException(
             f"SSH key file not found: {config.REMOTE_KEY_FILE}"
         )
 
-    with fabric.Connection(
-        config.REMOTE_ADDRESS,
-        user=config.REMOTE_USERNAME,
-        port=config.REMOTE_PORT,
-        connect_timeout=10,
-        connect_kwargs={
-            "password": config.REMOTE_PASSWORD,
-            "key_filename": config.REMOTE_KEY_FILE,
-            "passphrase": config.REMOTE_KEY_FILE_PASSWORD,
-        },
-    ) as client:
-        client.put(config.SCHEDULE_PATH, config.REMOTE_DIRECTORY)
+    # A previous upload may be stuck on a dead connection. It is closed
+    # when that upload times out, so do not wait on it indefinitely.
+    if not _ssh_lock.acquire(timeout=SSH_TIMEOUT):
+        raise SSHException("Timed out waiting for a previous SSH upload.")
 
+    try:
+        client = _ssh_connection
+        if client is None or not client.is_connected:
+            if client is not None:
+                with suppress(Exception):
+                    client.close()
+            _ssh_connection = None
+            client = fabric.Connection(
+                config.REMOTE_ADDRESS,
+                user=config.REMOTE_USERNAME,
+                port=config.REMOTE_PORT,
+                connect_timeout=10,
+                connect_kwargs={
+                    "password": config.REMOTE_PASSWORD,
+                    "key_filename": config.REMOTE_KEY_FILE,
+                    "passphrase": config.REMOTE_KEY_FILE_PASSWORD,
+                },
+            )
+            try:
+                client.open()
+                # Keepalives detect connections dropped while idle, and the
+                # channel timeout stops a transfer on a half-open connection
+                # from blocking forever.
+                client.transport.set_keepalive(SSH_KEEPALIVE_INTERVAL)
+                client.sftp().get_channel().settimeout(SSH_TIMEOUT)
+            except BaseException:
+                with suppress(Exception):
+                    client.close()
+                raise
+            _ssh_connection = client
 
-@concurrent.thread
+        try:
+            client.put(config.SCHEDULE_PATH, config.REMOTE_DIRECTORY)
+        except BaseException:
+            with suppress(Exception):
+                client.close()
+            if _ssh_connection is client:
+                _ssh_connection = None
+            raise
+    finally:
+        _ssh_lock.release()
+
+
+@_run_in_pool(_index_pool)
 def write_index(play_index, stats: StreamStats):
     """Write play_index and elapsed time to play_index.txt at the period set by
     `config.TIME_RECORD_INTERVAL`. A `StreamStats` object is used to track
     elapsed time.
     """
 
-    with open(config.PLAY_INDEX_FILE, "w", encoding="utf-8") as index_file:
-        index_file.write(f"{play_index}\n{stats.elapsed_time}")
+    # Write to a temporary file and rename it over the index file, so an
+    # interruption never leaves a truncated index file behind.
+    temp_path = config.PLAY_INDEX_FILE + ".tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, f"{play_index}\n{stats.elapsed_time}".encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(temp_path, config.PLAY_INDEX_FILE)
 
 
 if __name__ == "__main__":
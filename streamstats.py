@@ -1,12 +1,41 @@
 """Module containing the StreamStats class."""
 
+from __future__ import annotations
+
 import datetime
+import functools
+import time
 from collections import deque
-from concurrent import futures
+from typing import TYPE_CHECKING
 
 import config
 import mail
 
+if TYPE_CHECKING:
+    from concurrent import futures
+
+_UTC = datetime.timezone.utc
+_ONE_DAY_SECONDS = 86400
+
+# Offset of the local timezone from UTC, read once at import. Used to
+# convert `config.MAIL_ALERT_STATUS_REPORT_TIME` from local time.
+_LOCAL_UTC_OFFSET = datetime.datetime.now().astimezone().utcoffset()
+
+
+def _now_utc() -> datetime.datetime:
+    """Return the current time as an aware datetime in UTC."""
+
+    return datetime.datetime.now(_UTC)
+
+
+@functools.lru_cache(maxsize=1)
+def _check_interval_delta(check_interval: int) -> datetime.timedelta:
+    """Return `config.CHECK_INTERVAL` as a timedelta. Cached on the value,
+    so the timedelta is only rebuilt if the setting changes.
+    """
+
+    return datetime.timedelta(seconds=check_interval)
+
 
 class StreamStats:
     """A singleton to store persistent information regarding the stream
@@ -14,6 +43,35 @@ class StreamStats:
     various timers.
     """
 
+    __slots__ = (
+        "recent_playlist",
+        "previous_files",
+        "prev_normal_count",
+        "prev_total_duration",
+        "program_start_time",
+        "elapsed_time",
+        "videos_since_restart",
+        "videos_since_exception",
+        "total_videos",
+        "stream_start_time",
+        "stream_time_remaining",
+        "video_resume_point",
+        "check_connection_future",
+        "schedule_future",
+        "last_connection_check",
+        "mail_daemon",
+        "newest_version",
+        "next_version_check",
+        "version_check_future",
+        "next_status_report",
+        "restarts",
+        "retries",
+        "stream_downtime",
+        "exceptions",
+        "last_exception_time",
+        "_last_exception_monotonic",
+    )
+
     recent_playlist: deque
     """A copy of the dict objects that were written as JSON objects on
     the most recent call to `write_schedule()`.
@@ -24,6 +82,14 @@ class StreamStats:
     appended to this deque.
     """
 
+    prev_normal_count: int
+    """Number of normal entries in `previous_files`."""
+
+    prev_total_duration: int
+    """Combined length in seconds of the normal entries in
+    `previous_files`.
+    """
+
     program_start_time: datetime.datetime
     """The time this program was started, in UTC."""
 
@@ -122,9 +188,13 @@ class StreamStats:
     took place.
     """
 
+    _last_exception_monotonic: float
+    """`last_exception_time` as a `time.monotonic()` value, used to
+    measure stream downtime.
+    """
+
     def __init__(self):
-        current_time = datetime.datetime.now(datetime.timezone.utc)
-        offset = datetime.datetime.now().astimezone().utcoffset()
+        current_time = _now_utc()
         self.recent_playlist = deque()
         if (
             config.SCHEDULE_PREVIOUS_MIN_VIDEOS >= 1
@@ -134,6 +204,8 @@ class StreamStats:
             self.previous_files = deque()
         else:
             self.previous_files = None
+        self.prev_normal_count = 0
+        self.prev_total_duration = 0
         self.program_start_time = current_time
         self.elapsed_time = 0
         self.videos_since_restart = 0
@@ -144,50 +216,73 @@ class StreamStats:
         self.video_resume_point = 0
         self.check_connection_future = None
         self.schedule_future = None
-        self.last_connection_check = current_time - datetime.timedelta(
-            seconds=config.CHECK_INTERVAL
+        self.last_connection_check = current_time - _check_interval_delta(
+            config.CHECK_INTERVAL
         )
         self.mail_daemon = None
         self.newest_version = config.SCRIPT_VERSION
         self.next_version_check = current_time
         self.version_check_future = None
-        self.next_status_report = (
+        # The report time is normalized in seconds, then converted back
+        # to a datetime once.
+        report_interval = config.MAIL_ALERT_STATUS_REPORT_SECONDS
+        current_timestamp = current_time.timestamp()
+        next_status_report = (
             current_time.replace(
                 hour=config.MAIL_ALERT_STATUS_REPORT_TIME[0],
                 minute=config.MAIL_ALERT_STATUS_REPORT_TIME[1],
                 second=0,
             )
-            - offset
-            + datetime.timedelta(days=config.MAIL_ALERT_STATUS_REPORT)
+            - _LOCAL_UTC_OFFSET
+        ).timestamp() + report_interval
+        if next_status_report < current_timestamp:
+            next_status_report += _ONE_DAY_SECONDS
+        elif next_status_report > current_timestamp + report_interval:
+            next_status_report -= _ONE_DAY_SECONDS
+        self.next_status_report = datetime.datetime.fromtimestamp(
+            next_status_report, _UTC
         )
-        if self.next_status_report < current_time:
-            self.next_status_report = self.next_status_report + datetime.timedelta(
-                days=1
-            )
-        elif self.next_status_report > current_time + datetime.timedelta(
-            days=config.MAIL_ALERT_STATUS_REPORT
-        ):
-            self.next_status_report = self.next_status_report - datetime.timedelta(
-                days=1
-            )
 
         self.restarts = 0
         self.retries = 0
         self.stream_downtime = 0
         self.exceptions = deque(maxlen=config.MAIL_ALERT_MAX_ERRORS_REPORTED)
         self.last_exception_time = current_time
+        self._last_exception_monotonic = time.monotonic()
+
+    def add_previous_file(self, item):
+        """Append a schedule entry to `previous_files`, updating
+        `prev_normal_count` and `prev_total_duration`.
+        """
+
+        self.previous_files.append(item)
+        if item["type"] == "normal":
+            self.prev_normal_count += 1
+            self.prev_total_duration += item["length"]
+
+    def pop_previous_file(self):
+        """Pop the oldest schedule entry from `previous_files`, updating
+        `prev_normal_count` and `prev_total_duration`, and return it.
+        """
+
+        item = self.previous_files.popleft()
+        if item["type"] == "normal":
+            self.prev_normal_count -= 1
+            self.prev_total_duration -= item["length"]
+        return item
 
     def rewind(self, time):
         """Subtract this many seconds from `elapsed_time`, without
         going below 0.
         """
 
-        self.elapsed_time = max(0, self.elapsed_time - time)
+        elapsed_time = self.elapsed_time - time
+        self.elapsed_time = elapsed_time if elapsed_time > 0 else 0
 
     def set_connection_check_time(self):
         """Set the last connection check time to the current time."""
 
-        self.last_connection_check = datetime.datetime.now(datetime.timezone.utc)
+        self.last_connection_check = _now_utc()
 
     def force_connection_check(self):
         """Set the last connection check time to the current time,
@@ -195,27 +290,64 @@ class StreamStats:
         check to take place immediately.
         """
 
-        self.last_connection_check = datetime.datetime.now(
-            datetime.timezone.utc
-        ) - datetime.timedelta(seconds=config.CHECK_INTERVAL)
+        self.last_connection_check = _now_utc() - _check_interval_delta(
+            config.CHECK_INTERVAL
+        )
 
     def update_stream_downtime(self):
         """Add the time between the last exception time and now to the
         stream downtime stat.
         """
 
-        self.stream_downtime += (
-            datetime.datetime.now(datetime.timezone.utc) - self.last_exception_time
-        ).total_seconds()
+        self.stream_downtime += time.monotonic() - self._last_exception_monotonic
+
+    def set_last_exception_time(self):
+        """Set the last exception time to the current time. The time is
+        also recorded on the monotonic clock for
+        `update_stream_downtime()`, so downtime is not affected by
+        system clock changes.
+        """
+
+        self.last_exception_time = _now_utc()
+        self._last_exception_monotonic = time.monotonic()
 
     def mail_daemon_running(self, exp=True):
         """Returns True if a mail daemon has initialized and is
         currently running.
 
-        `exp` can be set to a expression that must also be True.
+        `exp` can be set to a expression that must also be True. If
+        `exp` is callable, it is called only if the mail daemon is
+        running.
         """
 
-        return self.mail_daemon is not None and self.mail_daemon.running and exp
+        if self.mail_daemon is None or not self.mail_daemon.running:
+            return False
+        return exp() if callable(exp) else exp
+
+
+_instance = None
+
+
+def get_stats() -> StreamStats:
+    """Return the program's `StreamStats` instance, creating it on the
+    first call.
+    """
+
+    global _instance
+
+    if _instance is None:
+        _instance = StreamStats()
+    return _instance
+
+
+def reset_stats():
+    """Discard the `StreamStats` instance returned by `get_stats()`, so
+    the next call creates a new one.
+    """
+
+    global _instance
+
+    _instance = None
 
 
 if __name__ == "__main__":
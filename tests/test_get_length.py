@@ -0,0 +1,218 @@
+import os
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_get_length_normal(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import playlist
+
+    calls = []
+
+    def run(args, **kwargs):
+        calls.append(args)
+        return SimpleNamespace(stdout=b"video\n1234.567000\n")
+
+    # Only playlist's reference to subprocess is replaced.
+    monkeypatch.setattr(
+        playlist,
+        "subprocess",
+        SimpleNamespace(run=run, PIPE=subprocess.PIPE, DEVNULL=subprocess.DEVNULL),
+    )
+    monkeypatch.setattr(playlist, "_length_cache", {})
+
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"")
+
+    assert playlist.get_length(str(path)) == 1234
+    assert len(calls) == 1
+    assert calls[0][0] == playlist.config.FFPROBE_PATH
+    assert calls[0][-1] == str(path)
+
+
+def test_get_length_no_video(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import playlist
+
+    def run(args, **kwargs):
+        return SimpleNamespace(stdout=b"1234.567000\n")
+
+    monkeypatch.setattr(
+        playlist,
+        "subprocess",
+        SimpleNamespace(run=run, PIPE=subprocess.PIPE, DEVNULL=subprocess.DEVNULL),
+    )
+    monkeypatch.setattr(playlist, "_length_cache", {})
+
+    path = tmp_path / "audio.mp3"
+    path.write_bytes(b"")
+
+    with pytest.raises(IndexError):
+        playlist.get_length(str(path))
+
+
+def test_get_length_no_duration(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import playlist
+
+    outputs = [b"video\nN/A\n", b"video\n"]
+
+    def run(args, **kwargs):
+        return SimpleNamespace(stdout=outputs.pop(0))
+
+    monkeypatch.setattr(
+        playlist,
+        "subprocess",
+        SimpleNamespace(run=run, PIPE=subprocess.PIPE, DEVNULL=subprocess.DEVNULL),
+    )
+    monkeypatch.setattr(playlist, "_length_cache", {})
+
+    path = tmp_path / "video.mkv"
+    path.write_bytes(b"")
+
+    with pytest.raises(ValueError):
+        playlist.get_length(str(path))
+    with pytest.raises(ValueError):
+        playlist.get_length(str(path))
+    assert playlist._length_cache == {}
+
+
+def test_get_length_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import playlist
+
+    outputs = [b"video\n100.0\n", b"video\n200.0\n", b"video\n300.0\n"]
+    calls = []
+
+    def run(args, **kwargs):
+        calls.append(args)
+        return SimpleNamespace(stdout=outputs.pop(0))
+
+    monkeypatch.setattr(
+        playlist,
+        "subprocess",
+        SimpleNamespace(run=run, PIPE=subprocess.PIPE, DEVNULL=subprocess.DEVNULL),
+    )
+    monkeypatch.setattr(playlist, "_length_cache", {})
+
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"1234")
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+    assert playlist.get_length(str(path)) == 100
+    assert playlist.get_length(str(path)) == 100
+    assert len(calls) == 1
+
+    # A new modification time invalidates the cached length.
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    assert playlist.get_length(str(path)) == 200
+    assert len(calls) == 2
+
+    # So does a new size, even if the modification time is unchanged.
+    with open(path, "ab") as file:
+        file.write(b"5678")
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    assert playlist.get_length(str(path)) == 300
+    assert playlist.get_length(str(path)) == 300
+    assert len(calls) == 3
+
+
+def test_get_length_ffprobe_not_found(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import playlist
+
+    monkeypatch.setattr(playlist, "_length_cache", {})
+    monkeypatch.setattr(
+        playlist.config, "FFPROBE_PATH", str(tmp_path / "missing" / "ffprobe")
+    )
+
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"")
+
+    with pytest.raises(playlist.FFprobeNotFoundError):
+        playlist.get_length(str(path))
+
+
+def test_get_length_ffprobe_failed(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import playlist
+
+    def run(args, **kwargs):
+        raise subprocess.CalledProcessError(1, args)
+
+    monkeypatch.setattr(
+        playlist,
+        "subprocess",
+        SimpleNamespace(run=run, PIPE=subprocess.PIPE, DEVNULL=subprocess.DEVNULL),
+    )
+    monkeypatch.setattr(playlist, "_length_cache", {})
+
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"")
+
+    with pytest.raises(subprocess.CalledProcessError):
+        playlist.get_length(str(path))
+
+
+def test_get_length_file_not_found(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import playlist
+
+    monkeypatch.setattr(playlist, "_length_cache", {})
+
+    with pytest.raises(FileNotFoundError):
+        playlist.get_length(str(tmp_path / "missing.mp4"))
+
+
+def test_prefetch_lengths(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import playlist
+    from playlist import PlaylistEntry
+
+    probed = []
+    monkeypatch.setattr(playlist, "get_length", probed.append)
+    monkeypatch.setattr(playlist, "_length_cache", {})
+
+    entries = [
+        PlaylistEntry("A.mp4"),
+        PlaylistEntry(":Extra"),
+        PlaylistEntry("B.mp4"),
+        PlaylistEntry("%RESTART"),
+        PlaylistEntry("C.mp4"),
+        PlaylistEntry(None),
+        PlaylistEntry("D.mp4"),
+        PlaylistEntry("A.mp4"),
+    ]
+    test_playlist = list(enumerate(entries, 1))
+    a, b, c, d = (entries[i].path for i in (0, 2, 4, 6))
+
+    # Starting near the end, the playlist wraps around. The second A counts
+    # towards the 4 entries but is only probed once, and C is not reached.
+    playlist.prefetch_lengths(test_playlist, 6, 4)
+    assert sorted(probed) == sorted([d, a, b])
+
+    # Cached paths are counted but not probed again.
+    probed.clear()
+    playlist._length_cache[d] = (0, 0, 60)
+    playlist.prefetch_lengths(test_playlist, 6, 4)
+    assert sorted(probed) == sorted([a, b])
+
+    # A count larger than the playlist stops after one pass.
+    probed.clear()
+    playlist.prefetch_lengths(test_playlist, 6, 100)
+    assert sorted(probed) == sorted([a, b, c])
+
+    probed.clear()
+    playlist._length_cache.update({a: (0, 0, 60), b: (0, 0, 60), c: (0, 0, 60)})
+    playlist.prefetch_lengths(test_playlist, 0, 100)
+    assert probed == []
@@ -0,0 +1,74 @@
+def test_previous_files_counters(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    from streamstats import get_stats, reset_stats
+
+    reset_stats()
+    stats = get_stats()
+
+    def check_counters():
+        normal = [i for i in stats.previous_files if i["type"] == "normal"]
+        assert stats.prev_normal_count == len(normal)
+        assert stats.prev_total_duration == sum(i["length"] for i in normal)
+
+    # Extra entries have a length of 0 in schedules, but a nonzero length
+    # here ensures they are excluded from prev_total_duration.
+    entries = [
+        {"type": "extra", "name": "", "length": 5, "extra_info": "Extra 1"},
+        {"type": "normal", "name": "Video 1", "length": 600, "extra_info": ""},
+        {"type": "extra", "name": "", "length": 5, "extra_info": "Extra 2"},
+        {"type": "extra", "name": "", "length": 5, "extra_info": "Extra 3"},
+        {"type": "normal", "name": "Video 2", "length": 1200, "extra_info": ""},
+        {"type": "normal", "name": "Video 3", "length": 45, "extra_info": ""},
+    ]
+
+    check_counters()
+    for entry in entries:
+        stats.add_previous_file(entry)
+        check_counters()
+
+    assert stats.prev_normal_count == 3
+    assert stats.prev_total_duration == 1845
+
+    for entry in entries[:4]:
+        assert stats.pop_previous_file() is entry
+        check_counters()
+
+    assert stats.prev_normal_count == 2
+    assert stats.prev_total_duration == 1245
+
+    stats.add_previous_file(entries[0])
+    stats.add_previous_file(entries[1])
+    check_counters()
+
+    while stats.previous_files:
+        stats.pop_previous_file()
+        check_counters()
+
+    assert stats.prev_normal_count == 0
+    assert stats.prev_total_duration == 0
+
+    reset_stats()
+
+
+def test_get_stats(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    from streamstats import StreamStats, get_stats, reset_stats
+
+    reset_stats()
+    stats = get_stats()
+    assert isinstance(stats, StreamStats)
+    assert get_stats() is stats
+
+    # Changes made through one reference are seen by later callers.
+    stats.elapsed_time = 100
+    assert get_stats().elapsed_time == 100
+
+    reset_stats()
+    new_stats = get_stats()
+    assert new_stats is not stats
+    assert new_stats.elapsed_time == 0
+    assert get_stats() is new_stats
+
+    reset_stats()
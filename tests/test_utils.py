@@ -0,0 +1,275 @@
+import datetime
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_int_to_time(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    from utils import int_to_time
+
+    assert int_to_time(0) == "0:00:00"
+    assert int_to_time(59) == "0:00:59"
+    assert int_to_time(3661) == "1:01:01"
+    assert int_to_time(360000) == "100:00:00"
+
+    # Fractional seconds are truncated.
+    assert int_to_time(3661.7) == "1:01:01"
+    assert int_to_time(59.99) == "0:00:59"
+
+    assert int_to_time(datetime.timedelta(hours=1, minutes=1, seconds=1.7)) == "1:01:01"
+    assert int_to_time(datetime.timedelta(days=1, minutes=3, seconds=4)) == "24:03:04"
+
+    with pytest.raises(ValueError):
+        int_to_time("3661")
+
+
+def test_int_to_total_time(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    from utils import int_to_total_time
+
+    assert int_to_total_time(0.5) == "less than a second"
+    assert int_to_total_time(0.5, round_down_zero=False) == "0 seconds"
+    assert int_to_total_time(1) == "1 second"
+    assert int_to_total_time(45) == "45 seconds"
+    assert int_to_total_time(60) == "1 minute"
+    assert int_to_total_time(3661) == "1 hour, 1 minute, 1 second"
+    assert int_to_total_time(180122) == "2 days, 2 hours, 2 minutes, 2 seconds"
+    assert int_to_total_time(90061.9) == "1 day, 1 hour, 1 minute, 1 second"
+    assert (
+        int_to_total_time(datetime.timedelta(days=1, seconds=3)) == "1 day, 3 seconds"
+    )
+
+    with pytest.raises(ValueError):
+        int_to_total_time(None)
+
+
+def test_int_to_total_time_without_seconds(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    from utils import int_to_total_time
+
+    # Seconds are still shown when there are no larger units.
+    assert int_to_total_time(1, include_seconds=False) == "1 second"
+    assert int_to_total_time(45, include_seconds=False) == "45 seconds"
+
+    # Otherwise they are truncated, not rounded.
+    assert int_to_total_time(61, include_seconds=False) == "1 minute"
+    assert int_to_total_time(119, include_seconds=False) == "1 minute"
+    assert int_to_total_time(3600, include_seconds=False) == "1 hour"
+    assert int_to_total_time(3661, include_seconds=False) == "1 hour, 1 minute"
+    assert (
+        int_to_total_time(180122, include_seconds=False) == "2 days, 2 hours, 2 minutes"
+    )
+    assert (
+        int_to_total_time(
+            datetime.timedelta(hours=1, seconds=1.5), include_seconds=False
+        )
+        == "1 hour"
+    )
+
+
+def test_check_file_not_found(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import utils
+
+    waits = []
+    messages = []
+
+    monkeypatch.setattr(
+        utils, "_wait_for_file", lambda path, timeout: waits.append(timeout)
+    )
+    monkeypatch.setattr(
+        utils, "print2", lambda level, message: messages.append(message)
+    )
+    monkeypatch.setattr(utils.config, "RETRY_ATTEMPTS", 3)
+    monkeypatch.setattr(utils.config, "RETRY_PERIOD", 5)
+    monkeypatch.setattr(utils.config, "RETRY_PERIOD_MAX", 15)
+    monkeypatch.setattr(utils.config, "EXIT_ON_FILE_NOT_FOUND", False)
+    utils.clear_isfile_cache()
+
+    path = str(tmp_path / "missing.mp4")
+
+    assert utils.check_file(path, line_num=4) == utils.CheckResult.MISSING
+    assert waits == [5, 10, 15]
+    assert messages == [
+        f"File not found: {path}.",
+        "3 attempts remaining. Retrying in 5 seconds...",
+        f"File not found: {path}.",
+        "2 attempts remaining. Retrying in 10 seconds...",
+        f"File not found: {path}.",
+        "1 attempt remaining. Retrying in 15 seconds...",
+        f"Line 4: {path} not found. Continuing.",
+    ]
+
+
+def test_check_file_no_retries(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import utils
+
+    waits = []
+    messages = []
+
+    monkeypatch.setattr(
+        utils, "_wait_for_file", lambda path, timeout: waits.append(timeout)
+    )
+    monkeypatch.setattr(
+        utils, "print2", lambda level, message: messages.append(message)
+    )
+    monkeypatch.setattr(utils.config, "RETRY_ATTEMPTS", 0)
+    monkeypatch.setattr(utils.config, "EXIT_ON_FILE_NOT_FOUND", False)
+    utils.clear_isfile_cache()
+
+    path = str(tmp_path / "missing.mp4")
+
+    assert utils.check_file(path) == utils.CheckResult.MISSING
+    assert waits == []
+    assert messages == [f"{path} not found. Continuing."]
+
+
+def test_check_file_found_on_retry(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import utils
+
+    waits = []
+    messages = []
+
+    # The file appears during the second wait.
+    def wait_for_file(path, timeout):
+        waits.append(timeout)
+        if len(waits) == 2:
+            open(path, "w").close()
+
+    monkeypatch.setattr(utils, "_wait_for_file", wait_for_file)
+    monkeypatch.setattr(
+        utils, "print2", lambda level, message: messages.append(message)
+    )
+    monkeypatch.setattr(utils.config, "RETRY_ATTEMPTS", 3)
+    monkeypatch.setattr(utils.config, "RETRY_PERIOD", 5)
+    monkeypatch.setattr(utils.config, "RETRY_PERIOD_MAX", 15)
+    utils.clear_isfile_cache()
+
+    path = str(tmp_path / "late.mp4")
+
+    assert utils.check_file(path) == utils.CheckResult.FOUND
+    assert waits == [5, 10]
+    assert len(messages) == 4
+
+
+def test_check_file_exit_on_file_not_found(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import utils
+
+    waits = []
+    messages = []
+
+    monkeypatch.setattr(
+        utils, "_wait_for_file", lambda path, timeout: waits.append(timeout)
+    )
+    monkeypatch.setattr(
+        utils, "print2", lambda level, message: messages.append(message)
+    )
+    monkeypatch.setattr(utils.config, "RETRY_ATTEMPTS", 1)
+    monkeypatch.setattr(utils.config, "RETRY_PERIOD", 5)
+    monkeypatch.setattr(utils.config, "RETRY_PERIOD_MAX", 15)
+    monkeypatch.setattr(utils.config, "EXIT_ON_FILE_NOT_FOUND", True)
+    utils.clear_isfile_cache()
+
+    path = str(tmp_path / "missing.mp4")
+
+    with pytest.raises(FileNotFoundError):
+        utils.check_file(path, line_num=4)
+    assert waits == [5]
+    assert messages[-1] == f"Line 4: {path} not found."
+
+    # no_exit overrides EXIT_ON_FILE_NOT_FOUND.
+    assert utils.check_file(path, no_exit=True) == utils.CheckResult.MISSING
+
+
+def test_wait_for_file_created(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import utils
+
+    sleeps = []
+    monkeypatch.setattr(
+        utils,
+        "time",
+        SimpleNamespace(monotonic=time.monotonic, sleep=sleeps.append),
+    )
+    utils.clear_isfile_cache()
+
+    path = tmp_path / "late.mp4"
+    timer = threading.Timer(0.2, path.write_bytes, args=(b"",))
+    timer.start()
+    start = time.monotonic()
+    try:
+        assert utils._wait_for_file(str(path), 5)
+    finally:
+        timer.cancel()
+    assert time.monotonic() - start < 2
+
+    # The directory is watched with inotify where it is available, so
+    # nothing is polled.
+    if utils._inotify_init1 is not None:
+        assert sleeps == []
+
+
+def test_wait_for_file_missing(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import utils
+
+    utils.clear_isfile_cache()
+
+    start = time.monotonic()
+    assert not utils._wait_for_file(str(tmp_path / "missing.mp4"), 0.3)
+    assert 0.3 <= time.monotonic() - start < 2
+
+
+def test_wait_for_file_no_parent(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "./tests/test_config.ini"])
+
+    import utils
+
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        time.sleep(seconds)
+
+    monkeypatch.setattr(
+        utils, "time", SimpleNamespace(monotonic=time.monotonic, sleep=sleep)
+    )
+    utils.clear_isfile_cache()
+
+    # A directory that does not exist cannot be watched, so the path is
+    # polled at doubling intervals instead.
+    path = tmp_path / "new" / "late.mp4"
+    start = time.monotonic()
+    assert not utils._wait_for_file(str(path), 0.3)
+    assert 0.3 <= time.monotonic() - start < 2
+    assert sleeps[0] == 0.1
+    assert len(sleeps) >= 2
+
+    sleeps.clear()
+
+    def create():
+        path.parent.mkdir()
+        path.write_bytes(b"")
+
+    timer = threading.Timer(0.2, create)
+    timer.start()
+    try:
+        assert utils._wait_for_file(str(path), 5)
+    finally:
+        timer.cancel()
+    assert sleeps
@@ -1,9 +1,15 @@
 """Helper functions."""
 
+import ctypes
 import datetime
 import errno
+import itertools
 import os
+import select
+import stat
 import time
+from contextlib import suppress
+from enum import IntEnum
 
 import config
 from config import print2
@@ -20,10 +26,19 @@ def int_to_time(seconds):
     elif not isinstance(seconds, (int, float)):
         raise ValueError("Not an int, float, or datetime.timedelta object")
 
-    hr, min = divmod(seconds, 3600)
-    min, sec = divmod(min, 60)
+    seconds = int(seconds)
 
-    return f"{hr}:{min:02d}:{sec:02d}"
+    return "%d:%02d:%02d" % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+# Units used by `int_to_total_time()`, as their length in seconds and
+# their singular and plural names.
+_TOTAL_TIME_UNITS = (
+    (86400, "day", "days"),
+    (3600, "hour", "hours"),
+    (60, "minute", "minutes"),
+    (1, "second", "seconds"),
+)
 
 
 def int_to_total_time(seconds, round_down_zero=True, include_seconds=True):
@@ -47,29 +62,136 @@ def int_to_total_time(seconds, round_down_zero=True, include_seconds=True):
     if seconds < 1:
         return "less than a second" if round_down_zero else "0 seconds"
 
-    days, hr = divmod(int(seconds), 86400)
-    hr, min = divmod(hr, 3600)
-    min, sec = divmod(min, 60)
+    seconds = int(seconds)
     string = []
 
-    if days > 0:
-        string.append(f"{days} days" if days != 1 else f"{days} day")
-    if hr > 0:
-        string.append(f"{hr} hours" if hr != 1 else f"{hr} hour")
-    if min > 0:
-        string.append(f"{min} minutes" if min != 1 else f"{min} minute")
-    if (include_seconds or (days == 0 and hr == 0 and min == 0)) and sec > 0:
-        string.append(f"{sec} seconds" if sec != 1 else f"{sec} second")
+    for unit_seconds, singular, plural in _TOTAL_TIME_UNITS:
+        # Seconds are only included on their own, unless include_seconds
+        # is True.
+        if unit_seconds == 1 and string and not include_seconds:
+            break
+        count, seconds = divmod(seconds, unit_seconds)
+        if count > 0:
+            string.append("%d %s" % (count, singular if count == 1 else plural))
 
     return ", ".join(string)
 
 
+# Seconds that a path found by `check_file()` is assumed to still exist.
+ISFILE_CACHE_TIME = 5
+
+# Paths found to be regular files, mapped to the `time.monotonic()` value
+# at which they must be checked again.
+_isfile_cache: dict[str, float] = {}
+
+
+def _isfile_cached(path):
+    """Equivalent to `os.path.isfile()`, but positive results are reused
+    for `ISFILE_CACHE_TIME` seconds.
+    """
+
+    now = time.monotonic()
+    if _isfile_cache.get(path, 0) > now:
+        return True
+
+    try:
+        is_file = stat.S_ISREG(os.stat(path).st_mode)
+    except (OSError, ValueError):
+        is_file = False
+
+    if is_file:
+        _isfile_cache[path] = now + ISFILE_CACHE_TIME
+    else:
+        _isfile_cache.pop(path, None)
+    return is_file
+
+
+# inotify events that can make a missing file appear in a directory, from
+# <sys/inotify.h>: IN_ATTRIB, IN_CLOSE_WRITE, IN_MOVED_TO and IN_CREATE.
+_INOTIFY_MASK = 0x00000004 | 0x00000008 | 0x00000080 | 0x00000100
+
+# inotify is only available on Linux. Elsewhere, _wait_for_file() polls.
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_add_watch = _libc.inotify_add_watch
+except (AttributeError, OSError, TypeError):
+    _inotify_init1 = None
+    _inotify_add_watch = None
+
+
+def _wait_for_file(path, timeout):
+    """Wait up to `timeout` seconds for `path` to become a file. Returns
+    True as soon as it does, or False if it does not.
+
+    On Linux, the parent directory is watched with inotify. If that is
+    not possible, the path is polled at increasing intervals starting
+    from 0.1 seconds.
+    """
+
+    deadline = time.monotonic() + timeout
+
+    if _inotify_init1 is not None:
+        inotify_fd = _inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if inotify_fd >= 0:
+            try:
+                parent = os.fsencode(os.path.dirname(os.path.abspath(path)))
+                if _inotify_add_watch(inotify_fd, parent, _INOTIFY_MASK) >= 0:
+                    # The file is checked again after the watch is added, in
+                    # case it was created before then.
+                    while not _isfile_cached(path):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        if select.select([inotify_fd], [], [], remaining)[0]:
+                            with suppress(BlockingIOError):
+                                os.read(inotify_fd, 4096)
+                    return True
+            finally:
+                os.close(inotify_fd)
+
+    delay = 0.1
+    while not _isfile_cached(path):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay *= 2
+    return True
+
+
+def clear_isfile_cache():
+    """Discard all results cached by `check_file()`."""
+
+    _isfile_cache.clear()
+
+
+class CheckResult(IntEnum):
+    """Result of `check_file()`. `MISSING` is falsy and the others are
+    truthy, so callers can still test the result as a bool.
+    """
+
+    MISSING = 0
+    "The file was not found after all retry attempts."
+
+    FOUND = 1
+    "The file exists."
+
+    NO_PATH = 2
+    "No path was given, so there was nothing to check."
+
+
 def check_file(path, line_num=None, no_exit=False, stats=None):
     """Retry opening nonexistent files up to `config.RETRY_ATTEMPTS`.
 
-    If file is found, returns True.
+    Returns a `CheckResult`. If file is found, returns `FOUND`. Files
+    that were found are not checked again for `ISFILE_CACHE_TIME`
+    seconds. Between attempts, waits up to `config.RETRY_PERIOD`
+    seconds, doubling after each attempt up to
+    `config.RETRY_PERIOD_MAX`, and continuing as soon as the file
+    appears.
     If `config.EXIT_ON_FILE_NOT_FOUND` is True, throw exception if
-    retry attempts don't succeed. If it is False, return False and
+    retry attempts don't succeed. If it is False, return `MISSING` and
     continue. `no_exit` overrides `config.EXIT_ON_FILE_NOT_FOUND`.
 
     `stats` is a StreamStats object that contains a running e-mail
@@ -79,18 +201,24 @@ def check_file(path, line_num=None, no_exit=False, stats=None):
     """
 
     if path is None:
-        return True
-
-    retry_attempts_remaining = config.RETRY_ATTEMPTS
+        return CheckResult.NO_PATH
+    if _isfile_cached(path):
+        return CheckResult.FOUND
 
-    # If RETRY_ATTEMPTS is -1, don't print number of attempts
-    # remaining.
-    retry_attempts_string = ""
+    # Each value is the number of attempts remaining after the next one.
+    # If RETRY_ATTEMPTS is -1, retry indefinitely and don't print number
+    # of attempts remaining.
+    if config.RETRY_ATTEMPTS < 0:
+        attempts = itertools.repeat(-1)
+    else:
+        attempts = range(config.RETRY_ATTEMPTS, 0, -1)
 
     # Send an e-mail alert immediately if RETRY_ATTEMPTS is -1.
     alert_sent = False
 
-    while not os.path.isfile(path):
+    retry_period = config.RETRY_PERIOD
+
+    for retry_attempts_remaining in attempts:
         if (
             not alert_sent
             and stats is not None
@@ -104,42 +232,42 @@ def check_file(path, line_num=None, no_exit=False, stats=None):
                 line_num=line_num,
             )
         # Print number of attempts remaining.
-        if retry_attempts_remaining > 0:
-            if retry_attempts_remaining > 1:
-                retry_attempts_string = (
-                    f"{retry_attempts_remaining} attempts remaining. "
-                )
-            else:
-                retry_attempts_string = "1 attempt remaining. "
-            retry_attempts_remaining -= 1
-        elif retry_attempts_remaining == 0:
-            if config.EXIT_ON_FILE_NOT_FOUND and not no_exit:
-                if line_num is not None:
-                    print2("fatal", f"Line {line_num}: {path} not found.")
-                else:
-                    print2("error", f"{path} not found.")
-                raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
-
-            if line_num is not None:
-                print2("error", f"Line {line_num}: {path} not found. Continuing.")
-            else:
-                print2("error", f"{path} not found. Continuing.")
-            return False
+        if retry_attempts_remaining > 1:
+            retry_attempts_string = f"{retry_attempts_remaining} attempts remaining. "
+        elif retry_attempts_remaining == 1:
+            retry_attempts_string = "1 attempt remaining. "
+        else:
+            retry_attempts_string = ""
 
         print2("error", f"File not found: {path}.")
         print2(
             "error",
-            f"{retry_attempts_string}Retrying in {config.RETRY_PERIOD} seconds...",
+            f"{retry_attempts_string}Retrying in {retry_period} seconds...",
         )
 
-        time.sleep(config.RETRY_PERIOD)
-    if (
-        alert_sent
-        and stats is not None
-        and stats.mail_daemon_running(config.MAIL_ALERT_ON_STREAM_RESUME)
-    ):
-        stats.mail_daemon.add_alert("stream_resume")
-    return True
+        _wait_for_file(path, retry_period)
+        retry_period = min(retry_period * 2, config.RETRY_PERIOD_MAX)
+        if _isfile_cached(path):
+            if (
+                alert_sent
+                and stats is not None
+                and stats.mail_daemon_running(config.MAIL_ALERT_ON_STREAM_RESUME)
+            ):
+                stats.mail_daemon.add_alert("stream_resume")
+            return CheckResult.FOUND
+
+    if config.EXIT_ON_FILE_NOT_FOUND and not no_exit:
+        if line_num is not None:
+            print2("fatal", f"Line {line_num}: {path} not found.")
+        else:
+            print2("error", f"{path} not found.")
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+
+    if line_num is not None:
+        print2("error", f"Line {line_num}: {path} not found. Continuing.")
+    else:
+        print2("error", f"{path} not found. Continuing.")
+    return CheckResult.MISSING
 
 
 if __name__ == "__main__":